@@ -4,17 +4,17 @@ Runs daily to observe markets, plan content, generate articles, and queue for re
 """
 
 import os
-import json
+import asyncio
+import hashlib
+import orjson
 import yaml
+import time
 import logging
 from datetime import datetime, timedelta
+from functools import cached_property
 from pathlib import Path
 
-from planner import ContentPlanner
-from writer import ContentWriter
-from publisher import ContentPublisher
-from monitor import PerformanceMonitor
-from linker import LinkGraphManager
+from rate_limiter import estimate_tokens
 
 # Setup logging
 logging.basicConfig(
@@ -44,11 +44,6 @@ class PredictionScopeAgent:
 
     def __init__(self, config_path: str = "config/agent.yaml"):
         self.config = self._load_config(config_path)
-        self.planner = ContentPlanner(self.config)
-        self.writer = ContentWriter(self.config)
-        self.publisher = ContentPublisher(self.config)
-        self.monitor = PerformanceMonitor(self.config)
-        self.linker = LinkGraphManager(self.config)
 
         self.run_date = datetime.now()
         self.run_id = self.run_date.strftime("%Y%m%d-%H%M%S")
@@ -59,7 +54,38 @@ class PredictionScopeAgent:
         with open(path, "r") as f:
             return yaml.safe_load(f)
 
-    def run(self, dry_run: bool = False):
+    # Subsystems are built on first use so a run only pays for what it touches
+    @cached_property
+    def planner(self):
+        from planner import ContentPlanner
+
+        return ContentPlanner(self.config, linker=self.linker)
+
+    @cached_property
+    def writer(self):
+        from writer import ContentWriter
+
+        return ContentWriter(self.config)
+
+    @cached_property
+    def publisher(self):
+        from publisher import ContentPublisher
+
+        return ContentPublisher(self.config)
+
+    @cached_property
+    def monitor(self):
+        from monitor import PerformanceMonitor
+
+        return PerformanceMonitor(self.config, linker=self.linker)
+
+    @cached_property
+    def linker(self):
+        from linker import LinkGraphManager
+
+        return LinkGraphManager(self.config)
+
+    def run(self, dry_run: bool = False, use_cache: bool = True):
         """Execute the full daily agent loop."""
         logger.info("=" * 60)
         logger.info(f"Starting daily run: {self.run_id}")
@@ -72,7 +98,11 @@ class PredictionScopeAgent:
 
             # Step 2: ANALYZE - Find opportunities
             logger.info("Step 2: ANALYZE - Identifying content opportunities...")
-            opportunities = self._analyze(market_data)
+            # Batch mode trades latency for cost; interactive dry runs stay synchronous
+            use_batch = self.config["agent"].get("batch_mode", False) and not dry_run
+            opportunities = self._analyze(
+                market_data, batch=use_batch, use_cache=use_cache
+            )
 
             # Step 3: PLAN - Decide what to write today
             logger.info("Step 3: PLAN - Creating content plan...")
@@ -80,7 +110,7 @@ class PredictionScopeAgent:
 
             # Step 4: CREATE - Generate the content
             logger.info(f"Step 4: CREATE - Generating {len(content_plan)} articles...")
-            articles = self._create(content_plan, market_data)
+            articles = self._create(content_plan, market_data, use_cache=use_cache)
 
             # Step 5: QUEUE - Submit for review
             if not dry_run:
@@ -110,70 +140,108 @@ class PredictionScopeAgent:
     # -------------------------------------------------------------------------
     def _observe(self) -> dict:
         """Pull fresh data from all market sources."""
+        return asyncio.run(self._aobserve())
+
+    async def _aobserve(self) -> dict:
+        """Pull fresh data from all market sources concurrently."""
+        from data_sources.http_client import create_http_client
         from data_sources.kalshi import KalshiClient
         from data_sources.polymarket import PolymarketClient
+        from data_sources.snapshots import SnapshotStore
 
         data = {"timestamp": self.run_date.isoformat(), "kalshi": {}, "polymarket": {}}
+        snapshots = SnapshotStore()
+
+        # One pooled client per run: it's closed with this loop, so repeated
+        # runs in one process don't leak connections
+        async with create_http_client() as http:
+            kalshi = KalshiClient(
+                os.environ.get("KALSHI_API_KEY"),
+                async_client=http,
+                snapshot_store=snapshots,
+            )
+            poly = PolymarketClient(async_client=http, snapshot_store=snapshots)
+            await asyncio.gather(
+                self._observe_kalshi(kalshi, data["kalshi"]),
+                self._observe_polymarket(poly, data["polymarket"]),
+            )
+
+        snapshots.save(self.run_date, data)
+
+        # Legacy per-day JSON snapshot, kept for one release cycle while
+        # readers move to the SQLite store
+        snapshot_path = f"data/market-snapshots/{self.run_date.strftime('%Y-%m-%d')}.json"
+        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
+        with open(snapshot_path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2, default=str))
+
+        return data
 
-        # Kalshi markets
+    async def _observe_kalshi(self, kalshi, out: dict):
         try:
-            kalshi = KalshiClient(os.environ.get("KALSHI_API_KEY"))
-            data["kalshi"]["markets"] = kalshi.get_active_markets()
-            data["kalshi"]["movers"] = kalshi.get_biggest_movers(hours=24)
-            data["kalshi"]["upcoming"] = kalshi.get_events_closing_soon(days=7)
+            # Pre-warm the client cache so the three views share one fetch
+            await kalshi.aget_active_markets(limit=200)
+            out["markets"], out["movers"], out["upcoming"] = await asyncio.gather(
+                kalshi.aget_active_markets(),
+                kalshi.aget_biggest_movers(hours=24, now=self.run_date),
+                kalshi.aget_events_closing_soon(days=7, now=self.run_date),
+            )
             logger.info(
-                f"Kalshi: {len(data['kalshi']['markets'])} active markets, "
-                f"{len(data['kalshi']['movers'])} big movers"
+                f"Kalshi: {len(out['markets'])} active markets, "
+                f"{len(out['movers'])} big movers"
             )
         except Exception as e:
             logger.warning(f"Kalshi data pull failed: {e}")
 
-        # Polymarket markets
+    async def _observe_polymarket(self, poly, out: dict):
         try:
-            poly = PolymarketClient()
-            data["polymarket"]["markets"] = poly.get_active_markets()
-            data["polymarket"]["movers"] = poly.get_biggest_movers(hours=24)
-            data["polymarket"]["trending"] = poly.get_trending()
+            await poly.aget_active_markets(limit=200)
+            out["markets"], out["movers"], out["trending"] = await asyncio.gather(
+                poly.aget_active_markets(),
+                poly.aget_biggest_movers(hours=24, now=self.run_date),
+                poly.aget_trending(),
+            )
             logger.info(
-                f"Polymarket: {len(data['polymarket']['markets'])} active markets, "
-                f"{len(data['polymarket']['movers'])} big movers"
+                f"Polymarket: {len(out['markets'])} active markets, "
+                f"{len(out['movers'])} big movers"
             )
         except Exception as e:
             logger.warning(f"Polymarket data pull failed: {e}")
 
-        # Save daily snapshot
-        snapshot_path = f"data/market-snapshots/{self.run_date.strftime('%Y-%m-%d')}.json"
-        os.makedirs(os.path.dirname(snapshot_path), exist_ok=True)
-        with open(snapshot_path, "w") as f:
-            json.dump(data, f, indent=2, default=str)
-
-        return data
-
     # -------------------------------------------------------------------------
     # Step 2: ANALYZE
     # -------------------------------------------------------------------------
-    def _analyze(self, market_data: dict) -> list[dict]:
+    def _analyze(
+        self, market_data: dict, batch: bool = False, use_cache: bool = True
+    ) -> list[dict]:
         """
         Use Claude to analyze market data and identify content opportunities.
         Returns a ranked list of potential article topics.
+
+        With batch=True the request goes through the Message Batches API,
+        which is billed at half price but completes asynchronously.
+        Results are cached on disk by a hash of the model, system prompt and
+        market highlights, so re-running on identical inputs skips the Claude
+        call.
         """
-        from anthropic import Anthropic
+        from writer import get_claude_client
 
-        client = Anthropic()
+        client = get_claude_client(
+            max_retries=self.config["agent"].get("claude_max_retries", 5)
+        )
 
         # Build context for Claude
         existing_content = self.linker.get_content_inventory()
         config = self.config
 
-        prompt = f"""You are the content strategist for PredictionScope, a prediction market 
-media site. Analyze the following market data and identify the best content opportunities 
+        # Static instructions + inventory go in a cached system block; only the
+        # day's market data changes between runs.
+        system_prompt = f"""You are the content strategist for PredictionScope, a prediction market 
+media site. Analyze the market data you are given and identify the best content opportunities 
 for today.
 
 EXISTING CONTENT (don't duplicate):
-{json.dumps(existing_content, indent=2)}
-
-TODAY'S MARKET DATA:
-{json.dumps(self._summarize_market_data(market_data), indent=2)}
+{orjson.dumps(existing_content, option=orjson.OPT_INDENT_2).decode()}
 
 CONTENT BUCKET WEIGHTS:
 - Educational (/learn/): {config['content_buckets']['learn']['weight']}
@@ -192,20 +260,79 @@ Identify 3-7 content opportunities. For each, provide:
 
 Respond ONLY with a JSON array. No preamble."""
 
-        response = client.messages.create(
-            model=config["agent"]["model"],
-            max_tokens=4096,
-            messages=[{"role": "user", "content": prompt}],
+        summary = self._summarize_market_data(market_data)
+        prompt = f"""TODAY'S MARKET DATA:
+{orjson.dumps(summary, option=orjson.OPT_INDENT_2).decode()}"""
+
+        params = {
+            "model": config["agent"]["model"],
+            "max_tokens": 4096,
+            "system": [
+                {
+                    "type": "text",
+                    "text": system_prompt,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+            "messages": [{"role": "user", "content": prompt}],
+        }
+
+        # The summary's date is a fresh timestamp every run, so it stays out of
+        # the key; identical markets on a rerun reuse the analysis.
+        request_key = orjson.dumps(
+            {
+                "model": params["model"],
+                "system": system_prompt,
+                "highlights": summary["highlights"],
+            },
+            option=orjson.OPT_SORT_KEYS,
         )
+        cache_path = Path(f"cache/analyze/{hashlib.blake2b(request_key).hexdigest()}.json")
+        if use_cache and cache_path.exists():
+            logger.info(f"Using cached analysis: {cache_path}")
+            return orjson.loads(cache_path.read_bytes())
+
+        if batch:
+            text = self._create_via_batch(client, f"analyze-{self.run_id}", params)
+        else:
+            # Runs before the article fan-out, so it only needs to be counted
+            self.writer.rate_limiter.record(estimate_tokens(params))
+            text = client.messages.create(**params).content[0].text
 
         try:
-            opportunities = json.loads(response.content[0].text)
+            opportunities = orjson.loads(text)
             logger.info(f"Identified {len(opportunities)} content opportunities")
-            return sorted(opportunities, key=lambda x: x.get("priority", 0), reverse=True)
-        except json.JSONDecodeError:
+            opportunities.sort(key=lambda x: x.get("priority", 0), reverse=True)
+        except orjson.JSONDecodeError:
             logger.error("Failed to parse opportunities from Claude response")
             return []
 
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_bytes(orjson.dumps(opportunities))
+        return opportunities
+
+    def _create_via_batch(self, client, custom_id: str, params: dict) -> str:
+        """Submit a single Messages request as a batch and block until it ends."""
+        poll_interval = self.config["agent"].get("batch_poll_interval_seconds", 60)
+
+        batch = client.messages.batches.create(
+            requests=[{"custom_id": custom_id, "params": params}]
+        )
+        logger.info(f"Submitted batch {batch.id} ({custom_id})")
+
+        while batch.processing_status != "ended":
+            time.sleep(poll_interval)
+            batch = client.messages.batches.retrieve(batch.id)
+
+        for entry in client.messages.batches.results(batch.id):
+            if entry.custom_id != custom_id:
+                continue
+            if entry.result.type != "succeeded":
+                raise RuntimeError(f"Batch {batch.id} request {entry.result.type}")
+            return entry.result.message.content[0].text
+
+        raise RuntimeError(f"Batch {batch.id} returned no result for {custom_id}")
+
     def _summarize_market_data(self, data: dict) -> dict:
         """Condense market data to fit in Claude's context efficiently."""
         summary = {"date": data["timestamp"], "highlights": []}
@@ -243,20 +370,30 @@ Respond ONLY with a JSON array. No preamble."""
     # -------------------------------------------------------------------------
     # Step 4: CREATE
     # -------------------------------------------------------------------------
-    def _create(self, content_plan: list[dict], market_data: dict) -> list[dict]:
+    def _create(
+        self, content_plan: list[dict], market_data: dict, use_cache: bool = True
+    ) -> list[dict]:
         """Generate full articles for each item in the content plan."""
+        return asyncio.run(self._acreate(content_plan, market_data, use_cache))
+
+    async def _acreate(
+        self, content_plan: list[dict], market_data: dict, use_cache: bool = True
+    ) -> list[dict]:
+        """Generate articles concurrently, bounded by max_concurrent_claude."""
+        results = await self.writer.agenerate_batch(
+            content_plan,
+            market_data,
+            self.linker.get_content_inventory(),
+            use_cache=use_cache,
+        )
+
         articles = []
-        for item in content_plan:
-            try:
-                article = self.writer.generate_article(
-                    plan_item=item,
-                    market_data=market_data,
-                    existing_content=self.linker.get_content_inventory(),
-                )
-                articles.append(article)
-                logger.info(f"Generated: {item['title']} ({item['bucket']})")
-            except Exception as e:
-                logger.error(f"Failed to generate '{item['title']}': {e}")
+        for item, result in zip(content_plan, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to generate '{item['title']}': {result}")
+                continue
+            articles.append(result)
+            logger.info(f"Generated: {item['title']} ({item['bucket']})")
 
         return articles
 
@@ -273,17 +410,22 @@ Respond ONLY with a JSON array. No preamble."""
             except Exception as e:
                 logger.error(f"Failed to queue '{article['title']}': {e}")
 
+        # New content files change the inventory for anything that runs next
+        self.linker.invalidate_inventory()
+
     def _save_drafts(self, articles: list[dict]):
         """Save drafts locally for dry run inspection."""
+        for bucket in {article["bucket"] for article in articles}:
+            os.makedirs(f"content/{bucket}", exist_ok=True)
+
         for article in articles:
-            bucket = article["bucket"]
-            slug = article["slug"]
-            path = f"content/{bucket}/{slug}.md"
-            os.makedirs(os.path.dirname(path), exist_ok=True)
+            path = f"content/{article['bucket']}/{article['slug']}.md"
             with open(path, "w") as f:
                 f.write(article["content"])
             logger.info(f"Draft saved: {path}")
 
+        self.linker.invalidate_inventory()
+
     # -------------------------------------------------------------------------
     # Step 6: MONITOR
     # -------------------------------------------------------------------------
@@ -329,10 +471,18 @@ Respond ONLY with a JSON array. No preamble."""
             ],
             "performance_snapshot": performance,
         }
-        log_path = f"logs/runs/{self.run_id}.json"
-        os.makedirs(os.path.dirname(log_path), exist_ok=True)
-        with open(log_path, "w") as f:
-            json.dump(log, f, indent=2, default=str)
+        os.makedirs("logs/runs", exist_ok=True)
+
+        # Run logs are internal; msgpack is smaller and faster to write.
+        # Read them back with scripts/cat_runlog.py.
+        if self.config["agent"].get("run_log_format", "json") == "msgpack":
+            import msgpack
+
+            with open(f"logs/runs/{self.run_id}.mp", "wb") as f:
+                f.write(msgpack.packb(log, default=str))
+        else:
+            with open(f"logs/runs/{self.run_id}.json", "wb") as f:
+                f.write(orjson.dumps(log, option=orjson.OPT_INDENT_2, default=str))
 
     def _notify_new_draft(self, article: dict, pr_url: str):
         """Send notification that a new draft is ready for review."""
@@ -361,7 +511,12 @@ if __name__ == "__main__":
         default="config/agent.yaml",
         help="Path to agent config file",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call Claude instead of reusing cached analyses and articles",
+    )
     args = parser.parse_args()
 
     agent = PredictionScopeAgent(config_path=args.config)
-    agent.run(dry_run=args.dry_run)
+    agent.run(dry_run=args.dry_run, use_cache=not args.no_cache)
@@ -0,0 +1,100 @@
+"""
+Caches for market data fetches.
+MarketsCache lets movers/closing-soon/trending share one HTTP round-trip
+per source; ETagCache lets repeat fetches across runs come back as 304s.
+"""
+
+import os
+import time
+from typing import Optional
+from urllib.parse import urlencode
+
+import orjson
+
+MARKETS_CACHE_TTL = 300  # 5 minutes
+ETAG_CACHE_PATH = "data/etag-cache.json"
+
+
+class MarketsCache:
+    """TTL cache of normalized market lists keyed by (limit, variant)."""
+
+    def __init__(self, ttl: float = MARKETS_CACHE_TTL):
+        self.ttl = ttl
+        self._entries: dict[tuple, tuple[float, list[dict]]] = {}
+
+    def get(self, limit: int, variant: Optional[str] = None) -> Optional[list[dict]]:
+        """
+        Return a fresh cached list for this request, or None on a miss.
+        `variant` distinguishes fetches with different filters or ordering
+        (e.g. a category or sort field). A larger cached fetch serves smaller
+        limits of the same variant since results share ordering.
+        Markets are shallow-copied so callers can annotate them safely.
+        """
+        now = time.monotonic()
+        for (cached_limit, cached_variant), (fetched_at, markets) in self._entries.items():
+            if (
+                cached_variant == variant
+                and cached_limit >= limit
+                and now - fetched_at < self.ttl
+            ):
+                return [dict(m) for m in markets[:limit]]
+        return None
+
+    def put(self, limit: int, variant: Optional[str], markets: list[dict]):
+        self._entries[(limit, variant)] = (time.monotonic(), markets)
+
+
+class ETagCache:
+    """ETags and response bodies persisted to disk for conditional GETs."""
+
+    def __init__(self, path: str = ETAG_CACHE_PATH):
+        self.path = path
+        try:
+            with open(path, "rb") as f:
+                self._entries: dict[str, dict] = orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            self._entries = {}
+
+    @staticmethod
+    def key(url: str, params: dict) -> str:
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    def headers(self, key: str, base: Optional[dict] = None) -> dict:
+        """Request headers with If-None-Match added when an ETag is stored."""
+        headers = dict(base or {})
+        entry = self._entries.get(key)
+        if entry:
+            headers["If-None-Match"] = entry["etag"]
+        return headers
+
+    def read(self, key: str, resp):
+        """
+        Return the JSON body of a requests/httpx response, substituting the
+        stored body on 304 Not Modified and recording new ETags on 200.
+        """
+        if resp.status_code == 304 and key in self._entries:
+            return self._entries[key]["body"]
+
+        resp.raise_for_status()
+        body = resp.json()
+        etag = resp.headers.get("ETag")
+        if etag:
+            self._entries[key] = {"etag": etag, "body": body}
+            self._save()
+        return body
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.write(orjson.dumps(self._entries))
+
+
+_etag_cache: Optional[ETagCache] = None
+
+
+def get_etag_cache() -> ETagCache:
+    """Return the process-wide ETagCache so sources don't clobber each other's file."""
+    global _etag_cache
+    if _etag_cache is None:
+        _etag_cache = ETagCache()
+    return _etag_cache
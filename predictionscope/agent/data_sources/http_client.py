@@ -0,0 +1,18 @@
+"""
+Shared HTTP client settings for market data sources.
+One HTTP/2 AsyncClient with keep-alive pooling, opened per observe run and
+handed to both Kalshi and Polymarket, amortizes TLS handshakes across their
+requests. Its pooled connections belong to the event loop that opened them,
+so the caller owns it (async with) rather than it living for the process.
+"""
+
+import httpx
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Return a new AsyncClient configured for the market data APIs."""
+    return httpx.AsyncClient(
+        http2=True,
+        timeout=10,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=32),
+    )
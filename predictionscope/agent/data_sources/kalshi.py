@@ -4,11 +4,17 @@ Pulls market data, price history, and event information.
 """
 
 import os
+import heapq
+import httpx
 import requests
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
 
+from .cache import MarketsCache, get_etag_cache
+from .http_client import create_http_client
+from .snapshots import SnapshotStore, compute_movers
+
 logger = logging.getLogger("predictionscope")
 
 KALSHI_API_BASE = "https://api.elections.kalshi.com/trade-api/v2"
@@ -17,92 +23,149 @@ KALSHI_API_BASE = "https://api.elections.kalshi.com/trade-api/v2"
 class KalshiClient:
     """Client for the Kalshi prediction market API."""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        async_client: Optional[httpx.AsyncClient] = None,
+        snapshot_store: Optional[SnapshotStore] = None,
+    ):
         self.api_key = api_key or os.environ.get("KALSHI_API_KEY", "")
+        self.headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
         self.session = requests.Session()
-        if self.api_key:
-            self.session.headers.update({"Authorization": f"Bearer {self.api_key}"})
+        self.session.headers.update(self.headers)
+
+        # Pass a shared AsyncClient to reuse connections across sources
+        self.async_client = async_client or create_http_client()
+        self._markets_cache = MarketsCache()
+        self._etags = get_etag_cache()
+        self.snapshots = snapshot_store or SnapshotStore()
 
     def get_active_markets(self, limit: int = 100, category: str = None) -> list[dict]:
         """Fetch active markets from Kalshi."""
-        params = {"limit": limit, "status": "open"}
-        if category:
-            params["series_ticker"] = category
+        cached = self._markets_cache.get(limit, category)
+        if cached is not None:
+            return cached
 
+        url = f"{KALSHI_API_BASE}/markets"
+        params = self._market_params(limit, category)
+        key = self._etags.key(url, params)
         try:
-            resp = self.session.get(f"{KALSHI_API_BASE}/markets", params=params)
-            resp.raise_for_status()
-            data = resp.json()
-            markets = data.get("markets", [])
-
-            return [
-                {
-                    "id": m.get("ticker", ""),
-                    "title": m.get("title", ""),
-                    "subtitle": m.get("subtitle", ""),
-                    "yes_price": m.get("yes_bid", 0) / 100 if m.get("yes_bid") else None,
-                    "no_price": m.get("no_bid", 0) / 100 if m.get("no_bid") else None,
-                    "volume": m.get("volume", 0),
-                    "open_interest": m.get("open_interest", 0),
-                    "category": m.get("category", ""),
-                    "close_date": m.get("close_time", ""),
-                    "source": "kalshi",
-                }
-                for m in markets
-            ]
+            resp = self.session.get(
+                url, params=params, headers=self._etags.headers(key)
+            )
+            body = self._etags.read(key, resp)
+            markets = self._parse_markets(body.get("markets", []))
+            self._markets_cache.put(limit, category, markets)
+            return [dict(m) for m in markets]
         except requests.RequestException as e:
             logger.error(f"Kalshi API error: {e}")
             return []
 
-    def get_biggest_movers(self, hours: int = 24, limit: int = 20) -> list[dict]:
+    async def aget_active_markets(
+        self, limit: int = 100, category: str = None
+    ) -> list[dict]:
+        """Async variant of get_active_markets."""
+        cached = self._markets_cache.get(limit, category)
+        if cached is not None:
+            return cached
+
+        url = f"{KALSHI_API_BASE}/markets"
+        params = self._market_params(limit, category)
+        key = self._etags.key(url, params)
+        try:
+            resp = await self.async_client.get(
+                url, params=params, headers=self._etags.headers(key, self.headers)
+            )
+            body = self._etags.read(key, resp)
+            markets = self._parse_markets(body.get("markets", []))
+            self._markets_cache.put(limit, category, markets)
+            return [dict(m) for m in markets]
+        except httpx.HTTPError as e:
+            logger.error(f"Kalshi API error: {e}")
+            return []
+
+    def _market_params(self, limit: int, category: Optional[str]) -> dict:
+        params = {"limit": limit, "status": "open"}
+        if category:
+            params["series_ticker"] = category
+        return params
+
+    def _parse_markets(self, markets: list[dict]) -> list[dict]:
+        """Normalize raw Kalshi markets into the shared market shape."""
+        return [
+            {
+                "id": m.get("ticker", ""),
+                "title": m.get("title", ""),
+                "subtitle": m.get("subtitle", ""),
+                "yes_price": m.get("yes_bid", 0) / 100 if m.get("yes_bid") else None,
+                "no_price": m.get("no_bid", 0) / 100 if m.get("no_bid") else None,
+                "volume": m.get("volume", 0),
+                "open_interest": m.get("open_interest", 0),
+                "category": m.get("category", ""),
+                "close_date": m.get("close_time", ""),
+                "source": "kalshi",
+            }
+            for m in markets
+        ]
+
+    def get_biggest_movers(
+        self, hours: int = 24, limit: int = 20, now: Optional[datetime] = None
+    ) -> list[dict]:
         """
         Find markets with the biggest price moves in the last N hours.
         Note: This requires comparing snapshots since Kalshi doesn't have a 
         native "movers" endpoint. Uses stored snapshots for comparison.
         """
         current_markets = self.get_active_markets(limit=200)
-
+        return self._compute_movers(current_markets, hours, limit, now)
+
+    async def aget_biggest_movers(
+        self, hours: int = 24, limit: int = 20, now: Optional[datetime] = None
+    ) -> list[dict]:
+        """Async variant of get_biggest_movers."""
+        current_markets = await self.aget_active_markets(limit=200)
+        return self._compute_movers(current_markets, hours, limit, now)
+
+    def _compute_movers(
+        self,
+        current_markets: list[dict],
+        hours: int,
+        limit: int,
+        now: Optional[datetime] = None,
+    ) -> list[dict]:
+        """Compare current prices against the stored snapshot from N hours ago."""
         # Load yesterday's snapshot for comparison
-        yesterday = (datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%d")
-        snapshot_path = f"data/market-snapshots/{yesterday}.json"
-
-        try:
-            import json
-
-            with open(snapshot_path, "r") as f:
-                old_data = json.load(f)
-            old_markets = {
-                m["id"]: m for m in old_data.get("kalshi", {}).get("markets", [])
-            }
-        except (FileNotFoundError, json.JSONDecodeError):
+        now = now or datetime.now()
+        yesterday = (now - timedelta(hours=hours)).strftime("%Y-%m-%d")
+        old_prices = self.snapshots.get_prices("kalshi", yesterday)
+        if not old_prices:
             logger.warning(f"No snapshot found for {yesterday}, can't compute movers")
             # Return markets sorted by volume as fallback
-            return sorted(current_markets, key=lambda x: x.get("volume", 0), reverse=True)[
-                :limit
-            ]
-
-        # Calculate price changes
-        movers = []
-        for market in current_markets:
-            old = old_markets.get(market["id"])
-            if old and market.get("yes_price") and old.get("yes_price"):
-                change = market["yes_price"] - old["yes_price"]
-                market["change_24h"] = round(change, 4)
-                market["change_pct"] = (
-                    round(change / old["yes_price"] * 100, 2)
-                    if old["yes_price"] > 0
-                    else 0
-                )
-                movers.append(market)
-
-        # Sort by absolute change
-        movers.sort(key=lambda x: abs(x.get("change_24h", 0)), reverse=True)
-        return movers[:limit]
-
-    def get_events_closing_soon(self, days: int = 7) -> list[dict]:
+            return heapq.nlargest(
+                limit, current_markets, key=lambda x: x.get("volume", 0)
+            )
+
+        return compute_movers(current_markets, old_prices, limit)
+
+    def get_events_closing_soon(
+        self, days: int = 7, now: Optional[datetime] = None
+    ) -> list[dict]:
         """Get markets closing within the next N days."""
         markets = self.get_active_markets(limit=200)
-        cutoff = datetime.now() + timedelta(days=days)
+        return self._filter_closing_soon(markets, days, now)
+
+    async def aget_events_closing_soon(
+        self, days: int = 7, now: Optional[datetime] = None
+    ) -> list[dict]:
+        """Async variant of get_events_closing_soon."""
+        markets = await self.aget_active_markets(limit=200)
+        return self._filter_closing_soon(markets, days, now)
+
+    def _filter_closing_soon(
+        self, markets: list[dict], days: int, now: Optional[datetime] = None
+    ) -> list[dict]:
+        now = now or datetime.now()
+        cutoff = now + timedelta(days=days)
 
         closing_soon = []
         for m in markets:
@@ -112,7 +175,7 @@ class KalshiClient:
                     close_dt = datetime.fromisoformat(close_date.replace("Z", "+00:00"))
                     if close_dt.replace(tzinfo=None) <= cutoff:
                         m["days_until_close"] = (
-                            close_dt.replace(tzinfo=None) - datetime.now()
+                            close_dt.replace(tzinfo=None) - now
                         ).days
                         closing_soon.append(m)
                 except ValueError:
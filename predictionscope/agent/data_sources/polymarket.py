@@ -4,62 +4,68 @@ Pulls market data from the Polymarket CLOB API.
 """
 
 import os
+import httpx
+import orjson
 import requests
 import logging
 from datetime import datetime, timedelta
 from typing import Optional
 
+from .cache import MarketsCache, get_etag_cache
+from .http_client import create_http_client
+from .snapshots import SnapshotStore, compute_movers
+
 logger = logging.getLogger("predictionscope")
 
 POLYMARKET_CLOB_BASE = "https://clob.polymarket.com"
 POLYMARKET_GAMMA_BASE = "https://gamma-api.polymarket.com"
 
 
+def _parse_first_price(outcome_prices) -> Optional[float]:
+    """Read the YES price from Gamma's outcomePrices, a JSON-encoded list."""
+    if not outcome_prices:
+        return None
+    if isinstance(outcome_prices, str):
+        outcome_prices = orjson.loads(outcome_prices)
+    return float(outcome_prices[0])
+
+
 class PolymarketClient:
     """Client for the Polymarket prediction market API."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        async_client: Optional[httpx.AsyncClient] = None,
+        snapshot_store: Optional[SnapshotStore] = None,
+    ):
+        self.headers = {"Accept": "application/json"}
         self.session = requests.Session()
-        self.session.headers.update({"Accept": "application/json"})
+        self.session.headers.update(self.headers)
 
-    def get_active_markets(self, limit: int = 100) -> list[dict]:
+        # Pass a shared AsyncClient to reuse connections across sources
+        self.async_client = async_client or create_http_client()
+        self._markets_cache = MarketsCache()
+        self._etags = get_etag_cache()
+        self.snapshots = snapshot_store or SnapshotStore()
+
+    def get_active_markets(
+        self, limit: int = 100, order: str = "volume24hr"
+    ) -> list[dict]:
         """Fetch active markets from Polymarket's Gamma API."""
+        cached = self._markets_cache.get(limit, order)
+        if cached is not None:
+            return cached
+
+        url = f"{POLYMARKET_GAMMA_BASE}/markets"
+        params = self._market_params(limit, order)
+        key = self._etags.key(url, params)
         try:
             resp = self.session.get(
-                f"{POLYMARKET_GAMMA_BASE}/markets",
-                params={
-                    "limit": limit,
-                    "active": True,
-                    "closed": False,
-                    "order": "volume24hr",
-                    "ascending": False,
-                },
+                url, params=params, headers=self._etags.headers(key)
             )
-            resp.raise_for_status()
-            markets = resp.json()
-
-            return [
-                {
-                    "id": m.get("condition_id", m.get("id", "")),
-                    "title": m.get("question", ""),
-                    "description": m.get("description", ""),
-                    "yes_price": (
-                        float(m.get("outcomePrices", "[0]").strip("[]").split(",")[0])
-                        if m.get("outcomePrices")
-                        else None
-                    ),
-                    "volume": float(m.get("volume", 0)),
-                    "volume_24h": float(m.get("volume24hr", 0)),
-                    "liquidity": float(m.get("liquidity", 0)),
-                    "category": m.get("groupItemTitle", ""),
-                    "close_date": m.get("endDate", ""),
-                    "source": "polymarket",
-                    "slug": m.get("slug", ""),
-                    "url": f"https://polymarket.com/event/{m.get('slug', '')}",
-                }
-                for m in markets
-                if isinstance(m, dict)
-            ]
+            markets = self._parse_markets(self._etags.read(key, resp))
+            self._markets_cache.put(limit, order, markets)
+            return [dict(m) for m in markets]
         except requests.RequestException as e:
             logger.error(f"Polymarket API error: {e}")
             return []
@@ -67,56 +73,107 @@ class PolymarketClient:
             logger.error(f"Polymarket parse error: {e}")
             return []
 
-    def get_biggest_movers(self, hours: int = 24, limit: int = 20) -> list[dict]:
+    async def aget_active_markets(
+        self, limit: int = 100, order: str = "volume24hr"
+    ) -> list[dict]:
+        """Async variant of get_active_markets."""
+        cached = self._markets_cache.get(limit, order)
+        if cached is not None:
+            return cached
+
+        url = f"{POLYMARKET_GAMMA_BASE}/markets"
+        params = self._market_params(limit, order)
+        key = self._etags.key(url, params)
+        try:
+            resp = await self.async_client.get(
+                url, params=params, headers=self._etags.headers(key, self.headers)
+            )
+            markets = self._parse_markets(self._etags.read(key, resp))
+            self._markets_cache.put(limit, order, markets)
+            return [dict(m) for m in markets]
+        except httpx.HTTPError as e:
+            logger.error(f"Polymarket API error: {e}")
+            return []
+        except (ValueError, IndexError) as e:
+            logger.error(f"Polymarket parse error: {e}")
+            return []
+
+    def _market_params(self, limit: int, order: str) -> dict:
+        # Gamma sorts server-side, so callers never need to re-sort the page
+        return {
+            "limit": limit,
+            "active": True,
+            "closed": False,
+            "order": order,
+            "ascending": False,
+        }
+
+    def _parse_markets(self, markets: list) -> list[dict]:
+        """Normalize raw Gamma markets into the shared market shape."""
+        return [
+            {
+                "id": m.get("condition_id", m.get("id", "")),
+                "title": m.get("question", ""),
+                "description": m.get("description", ""),
+                "yes_price": _parse_first_price(m.get("outcomePrices")),
+                "volume": float(m.get("volume", 0)),
+                "volume_24h": float(m.get("volume24hr", 0)),
+                "liquidity": float(m.get("liquidity", 0)),
+                "category": m.get("groupItemTitle", ""),
+                "close_date": m.get("endDate", ""),
+                "source": "polymarket",
+                "slug": m.get("slug", ""),
+                "url": f"https://polymarket.com/event/{m.get('slug', '')}",
+            }
+            for m in markets
+            if isinstance(m, dict)
+        ]
+
+    def get_biggest_movers(
+        self, hours: int = 24, limit: int = 20, now: Optional[datetime] = None
+    ) -> list[dict]:
         """
         Find markets with biggest price changes.
         Uses snapshot comparison similar to Kalshi client.
         """
         current_markets = self.get_active_markets(limit=200)
-
+        return self._compute_movers(current_markets, hours, limit, now)
+
+    async def aget_biggest_movers(
+        self, hours: int = 24, limit: int = 20, now: Optional[datetime] = None
+    ) -> list[dict]:
+        """Async variant of get_biggest_movers."""
+        current_markets = await self.aget_active_markets(limit=200)
+        return self._compute_movers(current_markets, hours, limit, now)
+
+    def _compute_movers(
+        self,
+        current_markets: list[dict],
+        hours: int,
+        limit: int,
+        now: Optional[datetime] = None,
+    ) -> list[dict]:
+        """Compare current prices against the stored snapshot from N hours ago."""
         # Load yesterday's snapshot
-        yesterday = (datetime.now() - timedelta(hours=hours)).strftime("%Y-%m-%d")
-        snapshot_path = f"data/market-snapshots/{yesterday}.json"
-
-        try:
-            import json
-
-            with open(snapshot_path, "r") as f:
-                old_data = json.load(f)
-            old_markets = {
-                m["id"]: m
-                for m in old_data.get("polymarket", {}).get("markets", [])
-            }
-        except (FileNotFoundError, json.JSONDecodeError):
+        now = now or datetime.now()
+        yesterday = (now - timedelta(hours=hours)).strftime("%Y-%m-%d")
+        old_prices = self.snapshots.get_prices("polymarket", yesterday)
+        if not old_prices:
             logger.warning(
                 f"No Polymarket snapshot for {yesterday}, returning by volume"
             )
-            return sorted(
-                current_markets, key=lambda x: x.get("volume_24h", 0), reverse=True
-            )[:limit]
-
-        movers = []
-        for market in current_markets:
-            old = old_markets.get(market["id"])
-            if old and market.get("yes_price") and old.get("yes_price"):
-                change = market["yes_price"] - old["yes_price"]
-                market["change_24h"] = round(change, 4)
-                market["change_pct"] = (
-                    round(change / old["yes_price"] * 100, 2)
-                    if old["yes_price"] > 0
-                    else 0
-                )
-                movers.append(market)
-
-        movers.sort(key=lambda x: abs(x.get("change_24h", 0)), reverse=True)
-        return movers[:limit]
+            # Already ordered by 24h volume server-side
+            return current_markets[:limit]
+
+        return compute_movers(current_markets, old_prices, limit)
 
     def get_trending(self, limit: int = 20) -> list[dict]:
         """Get trending markets by 24h volume."""
-        markets = self.get_active_markets(limit=200)
-        return sorted(
-            markets, key=lambda x: x.get("volume_24h", 0), reverse=True
-        )[:limit]
+        return self.get_active_markets(limit=limit, order="volume24hr")
+
+    async def aget_trending(self, limit: int = 20) -> list[dict]:
+        """Async variant of get_trending."""
+        return await self.aget_active_markets(limit=limit, order="volume24hr")
 
     def get_market_detail(self, condition_id: str) -> Optional[dict]:
         """Get detailed info about a specific market."""
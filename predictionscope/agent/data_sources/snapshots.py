@@ -0,0 +1,122 @@
+"""
+Market snapshot store for PredictionScope
+Appends every observed market to one SQLite database (WAL mode) indexed
+by source and timestamp, so movers and back-tests can query any window
+without scanning per-day JSON files.
+"""
+
+import os
+import heapq
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+
+import orjson
+
+logger = logging.getLogger("predictionscope")
+
+SNAPSHOT_DIR = "data/market-snapshots"
+SNAPSHOT_DB_PATH = "data/snapshots.sqlite"
+
+
+def compute_movers(
+    current_markets: list[dict], old_prices: dict[str, float], limit: int
+) -> list[dict]:
+    """
+    Annotate markets priced in both snapshots with change_24h/change_pct
+    and return the `limit` largest absolute moves.
+    """
+    get_old = old_prices.get
+    movers = []
+    for market in current_markets:
+        price = market.get("yes_price")
+        old_price = get_old(market["id"])
+        if price and old_price:
+            change = price - old_price
+            market["change_24h"] = round(change, 4)
+            market["change_pct"] = (
+                round(change / old_price * 100, 2) if old_price > 0 else 0
+            )
+            movers.append(market)
+
+    return heapq.nlargest(limit, movers, key=lambda x: abs(x["change_24h"]))
+
+
+class SnapshotStore:
+    """Append-only market snapshots keyed by (source, id, ts)."""
+
+    def __init__(self, path: str = SNAPSHOT_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS snapshot (
+                source TEXT NOT NULL,
+                id TEXT NOT NULL,
+                ts INTEGER NOT NULL,
+                yes_price REAL,
+                volume REAL,
+                raw JSON,
+                PRIMARY KEY (source, id, ts)
+            )"""
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS snapshot_source_ts ON snapshot (source, ts)"
+        )
+
+    def save(self, taken_at: datetime, data: dict):
+        """Append the active markets from an observe run."""
+        ts = int(taken_at.timestamp())
+        rows = [
+            (
+                source,
+                m["id"],
+                ts,
+                m.get("yes_price"),
+                m.get("volume"),
+                orjson.dumps(m, default=str).decode(),
+            )
+            for source in ("kalshi", "polymarket")
+            for m in data.get(source, {}).get("markets", [])
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO snapshot (source, id, ts, yes_price, volume, raw) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def get_prices_between(
+        self, source: str, start: datetime, end: datetime
+    ) -> dict[str, float]:
+        """Return {market_id: yes_price} using the latest snapshot in [start, end)."""
+        rows = self.conn.execute(
+            "SELECT id, yes_price FROM snapshot "
+            "WHERE source = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (source, int(start.timestamp()), int(end.timestamp())),
+        )
+        return dict(rows)
+
+    def get_prices(self, source: str, date: str) -> dict[str, float]:
+        """
+        Return {market_id: yes_price} for one source on one day (YYYY-MM-DD).
+        Falls back to the legacy per-day JSON snapshot for days recorded
+        before the store existed. Empty dict if neither is available.
+        """
+        day = datetime.strptime(date, "%Y-%m-%d")
+        prices = self.get_prices_between(source, day, day + timedelta(days=1))
+        if prices:
+            return prices
+        return self._load_legacy_json(source, date)
+
+    def _load_legacy_json(self, source: str, date: str) -> dict[str, float]:
+        try:
+            with open(f"{SNAPSHOT_DIR}/{date}.json", "rb") as f:
+                old_data = orjson.loads(f.read())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            return {}
+        return {
+            m["id"]: m.get("yes_price")
+            for m in old_data.get(source, {}).get("markets", [])
+        }
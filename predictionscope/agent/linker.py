@@ -5,13 +5,81 @@ Ensures proper cross-linking between content buckets.
 """
 
 import os
+import re
 import json
 import yaml
+import orjson
 import logging
+from array import array
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
+from typing import NamedTuple, Optional
+
+try:
+    # libyaml-backed loader; an order of magnitude faster than pure Python
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
 logger = logging.getLogger("predictionscope")
 
+CONTENT_DIRS = {
+    "learn": "content/learn",
+    "markets": "content/markets",
+    "best": "content/best",
+}
+FRONTMATTER_INDEX_PATH = "data/frontmatter.json"
+MAX_SCAN_WORKERS = 32  # Parse threads for a full content rescan
+
+# Markdown links whose target starts with / (internal links)
+_LINK_RE = re.compile(r"\[[^\]]*\]\((/[^)\s]+)\)")
+
+
+def content_mtimes(content_dirs: dict = CONTENT_DIRS) -> dict[str, int]:
+    """Map every markdown file under the content dirs to its st_mtime_ns."""
+    mtimes = {}
+    for dir_path in content_dirs.values():
+        try:
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".md"):
+                        mtimes[entry.path] = entry.stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+    return mtimes
+
+
+def load_frontmatter_index(
+    path: str = FRONTMATTER_INDEX_PATH, mtimes: Optional[dict] = None
+) -> Optional[list[dict]]:
+    """
+    Return the prebuilt inventory from data/frontmatter.json, or None if the
+    index is missing or stale relative to the markdown files on disk.
+    """
+    try:
+        with open(path, "rb") as f:
+            index = orjson.loads(f.read())
+    except (FileNotFoundError, orjson.JSONDecodeError):
+        return None
+
+    if index.get("mtimes") != (content_mtimes() if mtimes is None else mtimes):
+        return None
+    return list(index.get("items", {}).values())
+
+
+class PublishedIndex(NamedTuple):
+    """Lookup tables over published content, for suggest_links and audit_links."""
+
+    items: list[dict]
+    keywords: list[frozenset]  # lowercased target_keywords, parallel to items
+    by_url: dict[str, dict]
+    by_bucket: dict[str, list[dict]]
+    postings: dict[str, set[int]]  # keyword -> indexes into items
+    urls: list[str]  # distinct published URLs; position is the URL's id
+    link_ids: array  # ids of every internal link that targets a published URL
+
 
 class LinkGraphManager:
     """Manages internal linking across the site's content."""
@@ -19,44 +87,95 @@ class LinkGraphManager:
     def __init__(self, config: dict):
         self.config = config
         self.site_map_path = "config/site-map.yaml"
-        self.content_dirs = {
-            "learn": "content/learn",
-            "markets": "content/markets",
-            "best": "content/best",
-        }
+        self.content_dirs = dict(CONTENT_DIRS)
+        self._inventory_cache = None
+        self._inventory_mtimes = {}
+        self._published_index = None
+        self._published_index_source = None
 
     def get_content_inventory(self) -> list[dict]:
         """
         Scan all content directories and return inventory.
         Each item includes slug, title, bucket, status, and outbound links.
+        The scan is cached and only redone when a markdown file is added,
+        removed, or modified (checked with a stat sweep).
         """
-        inventory = []
+        mtimes = content_mtimes(self.content_dirs)
+        if self._inventory_cache is not None and mtimes == self._inventory_mtimes:
+            return self._inventory_cache
+
+        # Prefer the build-time index; only parse markdown when it's stale
+        inventory = load_frontmatter_index(mtimes=mtimes)
+        if inventory is None:
+            inventory = list(self._scan_content())
+        self._inventory_cache = inventory
+        self._inventory_mtimes = mtimes
+        return inventory
+
+    def invalidate_inventory(self):
+        """Drop the cached inventory so the next call rescans."""
+        self._inventory_cache = None
 
+    def build_frontmatter_index(self, path: str = FRONTMATTER_INDEX_PATH) -> int:
+        """
+        Scan all content and write data/frontmatter.json, keyed by bucket/slug,
+        along with the file mtimes it was built from. Returns the item count.
+        """
+        mtimes = content_mtimes(self.content_dirs)
+        inventory = list(self._scan_content())
+        index = {
+            "mtimes": mtimes,
+            "items": {f"{item['bucket']}/{item['slug']}": item for item in inventory},
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(index, default=str))
+
+        self._inventory_cache = inventory
+        self._inventory_mtimes = mtimes
+        return len(inventory)
+
+    def _scan_content(self):
+        """
+        Parse every markdown file under the content dirs, yielding items.
+        Files are parsed on a thread pool: reads and libyaml's C parser both
+        release the GIL, so the per-file work overlaps.
+        """
+        entries = []
         for bucket, dir_path in self.content_dirs.items():
-            if not os.path.exists(dir_path):
+            try:
+                with os.scandir(dir_path) as it:
+                    entries.extend(
+                        (bucket, e)
+                        for e in it
+                        if e.name.endswith(".md") and e.is_file(follow_symlinks=False)
+                    )
+            except FileNotFoundError:
                 continue
 
-            for filename in os.listdir(dir_path):
-                if not filename.endswith(".md"):
-                    continue
+        if len(entries) <= 1:
+            yield from map(self._scan_entry, entries)
+            return
 
-                filepath = os.path.join(dir_path, filename)
-                metadata = self._extract_frontmatter(filepath)
+        workers = min(MAX_SCAN_WORKERS, len(entries))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(self._scan_entry, entries)
 
-                inventory.append(
-                    {
-                        "slug": filename.replace(".md", ""),
-                        "bucket": bucket,
-                        "title": metadata.get("title", filename),
-                        "status": metadata.get("status", "draft"),
-                        "target_keywords": metadata.get("target_keywords", []),
-                        "url": f"/{bucket}/{filename.replace('.md', '')}",
-                        "internal_links": self._extract_links(filepath),
-                        "word_count": metadata.get("word_count", 0),
-                    }
-                )
+    def _scan_entry(self, bucket_entry: tuple[str, os.DirEntry]) -> dict:
+        bucket, entry = bucket_entry
+        slug = entry.name[: -len(".md")]
+        metadata, links = self._parse_markdown(entry.path)
 
-        return inventory
+        return {
+            "slug": slug,
+            "bucket": bucket,
+            "title": metadata.get("title", entry.name),
+            "status": metadata.get("status", "draft"),
+            "target_keywords": metadata.get("target_keywords", []),
+            "url": f"/{bucket}/{slug}",
+            "internal_links": links,
+            "word_count": metadata.get("word_count", 0),
+        }
 
     def suggest_links(self, article_bucket: str, article_keywords: list[str]) -> list[dict]:
         """
@@ -68,49 +187,56 @@ class LinkGraphManager:
         - Educational articles should link to related educational content
         - Affiliate pages should link to educational explainers
         """
-        inventory = self.get_content_inventory()
-        published = [item for item in inventory if item.get("status") == "published"]
+        max_links = self.config.get("linking", {}).get("max_internal_links_per_article", 8)
+        if max_links <= 0:
+            return []
+
+        index = self._get_published_index()
         suggestions = []
+        seen_targets: set[str] = set()
 
         # Always suggest core pages
         always_link = self.config.get("linking", {}).get("always_link_to", [])
         for url in always_link:
-            matching = [item for item in published if item["url"] == url]
-            if matching:
+            item = index.by_url.get(url)
+            if item:
                 suggestions.append(
                     {
                         "target": url,
-                        "title": matching[0]["title"],
+                        "title": item["title"],
                         "reason": "core_page",
                     }
                 )
+                seen_targets.add(url)
+                if len(suggestions) >= max_links:
+                    return suggestions
 
-        # Keyword-based suggestions
+        # Keyword-based suggestions: only visit items sharing a keyword,
+        # strongest overlap first (ties keep inventory order)
         keywords_lower = set(kw.lower() for kw in article_keywords)
-        for item in published:
-            if item["bucket"] == article_bucket and item["url"] in [
-                s["target"] for s in suggestions
-            ]:
+        candidates = set().union(*(index.postings.get(kw, ()) for kw in keywords_lower))
+        overlaps = {idx: keywords_lower & index.keywords[idx] for idx in candidates}
+        for idx in sorted(overlaps, key=lambda idx: (-len(overlaps[idx]), idx)):
+            item = index.items[idx]
+            if item["bucket"] == article_bucket and item["url"] in seen_targets:
                 continue
 
-            item_keywords = set(kw.lower() for kw in item.get("target_keywords", []))
-            overlap = keywords_lower & item_keywords
-
-            if overlap:
-                suggestions.append(
-                    {
-                        "target": item["url"],
-                        "title": item["title"],
-                        "reason": f"keyword_overlap: {overlap}",
-                    }
-                )
+            suggestions.append(
+                {
+                    "target": item["url"],
+                    "title": item["title"],
+                    "reason": f"keyword_overlap: {overlaps[idx]}",
+                }
+            )
+            seen_targets.add(item["url"])
+            if len(suggestions) >= max_links:
+                return suggestions
 
         # Cross-bucket linking
         if article_bucket == "markets":
             # Link to educational content
-            learn_pages = [item for item in published if item["bucket"] == "learn"]
-            for page in learn_pages[:3]:
-                if page["url"] not in [s["target"] for s in suggestions]:
+            for page in index.by_bucket.get("learn", [])[:3]:
+                if page["url"] not in seen_targets:
                     suggestions.append(
                         {
                             "target": page["url"],
@@ -118,11 +244,13 @@ class LinkGraphManager:
                             "reason": "cross_bucket_learn",
                         }
                     )
+                    seen_targets.add(page["url"])
+                    if len(suggestions) >= max_links:
+                        return suggestions
 
             # Link to affiliate pages
-            best_pages = [item for item in published if item["bucket"] == "best"]
-            for page in best_pages[:1]:
-                if page["url"] not in [s["target"] for s in suggestions]:
+            for page in index.by_bucket.get("best", [])[:1]:
+                if page["url"] not in seen_targets:
                     suggestions.append(
                         {
                             "target": page["url"],
@@ -130,65 +258,128 @@ class LinkGraphManager:
                             "reason": "cross_bucket_affiliate",
                         }
                     )
+                    seen_targets.add(page["url"])
 
-        max_links = self.config.get("linking", {}).get("max_internal_links_per_article", 8)
-        return suggestions[:max_links]
+        return suggestions
+
+    def _get_published_index(self) -> PublishedIndex:
+        """
+        Lookup tables over the published inventory, rebuilt only when the
+        inventory itself has been rescanned. Keyword sets live here rather than
+        on the items so the inventory stays JSON-serializable for prompts and
+        the index file.
+        """
+        inventory = self.get_content_inventory()
+        if self._published_index_source is not inventory:
+            published = [item for item in inventory if item.get("status") == "published"]
+            keywords = [
+                frozenset(kw.lower() for kw in item.get("target_keywords", []))
+                for item in published
+            ]
+            by_url = {}
+            by_bucket: dict[str, list[dict]] = {}
+            postings: dict[str, set[int]] = {}
+            for idx, item in enumerate(published):
+                by_url.setdefault(item["url"], item)
+                by_bucket.setdefault(item["bucket"], []).append(item)
+                for kw in keywords[idx]:
+                    postings.setdefault(kw, set()).add(idx)
+
+            # Links resolved to integer URL ids once, so audits tally ints
+            url_ids = {url: i for i, url in enumerate(by_url)}
+            link_ids = array(
+                "i",
+                (
+                    url_ids[link]
+                    for link in chain.from_iterable(
+                        item.get("internal_links", ()) for item in published
+                    )
+                    if link in url_ids
+                ),
+            )
+            self._published_index = PublishedIndex(
+                published, keywords, by_url, by_bucket, postings, list(by_url), link_ids
+            )
+            self._published_index_source = inventory
+        return self._published_index
 
     def audit_links(self) -> dict:
         """
         Audit the internal link graph.
         Find orphan pages (no inbound links) and pages that need more links.
         """
-        inventory = self.get_content_inventory()
-        published = [item for item in inventory if item.get("status") == "published"]
-
-        # Count inbound links per page
-        inbound_counts = {item["url"]: 0 for item in published}
-        for item in published:
-            for link in item.get("internal_links", []):
-                if link in inbound_counts:
-                    inbound_counts[link] += 1
+        index = self._get_published_index()
+        urls = index.urls
 
-        orphans = [url for url, count in inbound_counts.items() if count == 0]
-        under_linked = [
-            url for url, count in inbound_counts.items() if 0 < count < 2
-        ]
+        # Count inbound links per page (URL order follows the inventory)
+        inbound_counts = Counter(index.link_ids)
+        orphans = [url for i, url in enumerate(urls) if i not in inbound_counts]
+        under_linked = [url for i, url in enumerate(urls) if inbound_counts[i] == 1]
 
         return {
-            "total_pages": len(published),
+            "total_pages": len(index.items),
             "orphan_pages": orphans,
             "under_linked_pages": under_linked,
-            "average_inbound_links": (
-                sum(inbound_counts.values()) / len(inbound_counts)
-                if inbound_counts
-                else 0
-            ),
+            "average_inbound_links": len(index.link_ids) / len(urls) if urls else 0,
         }
 
-    def _extract_frontmatter(self, filepath: str) -> dict:
-        """Extract YAML frontmatter from a markdown file."""
+    def _parse_markdown(self, filepath: str) -> tuple[dict, list[str]]:
+        """Read a markdown file once and return (frontmatter, internal links)."""
         try:
-            with open(filepath, "r") as f:
+            with open(filepath, "r", encoding="utf-8") as f:
                 content = f.read()
-            if content.startswith("---"):
-                parts = content.split("---", 2)
-                if len(parts) >= 3:
-                    return yaml.safe_load(parts[1]) or {}
-        except Exception:
-            pass
-        return {}
+        except (OSError, UnicodeDecodeError):
+            return {}, []
+
+        metadata, body = {}, content
+        if content.startswith("---"):
+            parts = content.split("---", 2)
+            if len(parts) >= 3:
+                try:
+                    metadata = yaml.load(parts[1], Loader=_YamlLoader) or {}
+                except Exception:
+                    # Not just YAMLError: bad scalars (e.g. date: 2024-13-45)
+                    # raise ValueError, and one draft mustn't sink the scan
+                    pass
+                body = parts[2]
+
+        if not isinstance(metadata, dict):
+            metadata = {}
+        return metadata, _LINK_RE.findall(body)
+
+    def _extract_frontmatter(self, filepath: str) -> dict:
+        """Extract YAML frontmatter from a markdown file."""
+        return self._parse_markdown(filepath)[0]
 
     def _extract_links(self, filepath: str) -> list[str]:
         """Extract internal links from markdown content."""
-        import re
+        return self._parse_markdown(filepath)[1]
 
-        links = []
-        try:
-            with open(filepath, "r") as f:
-                content = f.read()
-            # Match markdown links that start with /
-            pattern = r"\[.*?\]\((\/[^)]+)\)"
-            links = re.findall(pattern, content)
-        except Exception:
-            pass
-        return links
+
+# =============================================================================
+# CLI Entry Point
+# =============================================================================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="PredictionScope Link Graph")
+    parser.add_argument(
+        "--build-index",
+        action="store_true",
+        help=f"Write the prebuilt content inventory to {FRONTMATTER_INDEX_PATH}",
+    )
+    parser.add_argument(
+        "--config",
+        default="config/agent.yaml",
+        help="Path to agent config file",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        linker = LinkGraphManager(yaml.safe_load(f))
+
+    if args.build_index:
+        count = linker.build_frontmatter_index()
+        print(f"Indexed {count} content files into {FRONTMATTER_INDEX_PATH}")
+    else:
+        print(orjson.dumps(linker.audit_links(), option=orjson.OPT_INDENT_2).decode())
@@ -4,21 +4,44 @@ Tracks indexation, rankings, traffic, and affiliate performance via GSC.
 """
 
 import os
-import json
+import time
+import hashlib
 import logging
+from pathlib import Path
+from collections import Counter
 from datetime import datetime, timedelta
 
+import orjson
+
+from linker import load_frontmatter_index
+
 logger = logging.getLogger("predictionscope")
 
+GSC_BATCH_SIZE = 100  # URL Inspection calls per batch HTTP request
+GSC_MAX_RETRIES = 3  # Backoff retries for rate-limited (429) inspections
+GSC_CACHE_TTL = 6 * 3600  # Seconds a cached GSC response stays fresh
+
 
 class PerformanceMonitor:
     """Monitors content performance via Google Search Console and analytics."""
 
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, linker=None):
         self.config = config
+        self.linker = linker  # shared LinkGraphManager, so its inventory cache is reused
         self.metrics_dir = "data/performance"
+        self.gsc_cache_dir = Path(self.metrics_dir) / ".cache"
+        self.site_url = os.environ.get("SITE_URL", "https://predictionscope.com")
+        self._gsc = None
         os.makedirs(self.metrics_dir, exist_ok=True)
 
+    def _service(self):
+        """Authenticated GSC service, built on first use and reused after."""
+        if self._gsc is None:
+            from google_auth import get_gsc_service
+
+            self._gsc = get_gsc_service()
+        return self._gsc
+
     def get_performance_report(self) -> dict:
         """
         Generate a daily performance report.
@@ -38,8 +61,8 @@ class PerformanceMonitor:
             self.metrics_dir,
             f"report-{datetime.now().strftime('%Y-%m-%d')}.json",
         )
-        with open(report_path, "w") as f:
-            json.dump(report, f, indent=2, default=str)
+        with open(report_path, "wb") as f:
+            f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2, default=str))
 
         return report
 
@@ -51,43 +74,34 @@ class PerformanceMonitor:
         Falls back to site: search if API unavailable.
         """
         try:
-            from google_auth import get_gsc_service
-
-            service = get_gsc_service()
-            site_url = os.environ.get("SITE_URL", "https://predictionscope.com")
+            service = self._service()
+            site_url = self.site_url
 
             # Get list of published content
             content_files = self._get_published_urls()
 
+            verdicts = self._cached_gsc(
+                {
+                    "endpoint": "urlInspection",
+                    "siteUrl": site_url,
+                    "urls": content_files,
+                },
+                lambda: self._inspect_urls(service, site_url, content_files),
+                # A partial result (failed batch, still throttled) isn't cached,
+                # so a transient outage doesn't read as "not indexed" for hours
+                cacheable=lambda verdicts: verdicts.keys() >= set(content_files),
+            )
+
             indexed = []
             not_indexed = []
-
             for url in content_files:
-                try:
-                    result = (
-                        service.urlInspection()
-                        .index()
-                        .inspect(
-                            body={
-                                "inspectionUrl": url,
-                                "siteUrl": site_url,
-                            }
-                        )
-                        .execute()
-                    )
-                    verdict = (
-                        result.get("inspectionResult", {})
-                        .get("indexStatusResult", {})
-                        .get("verdict", "UNKNOWN")
-                    )
-
-                    if verdict == "PASS":
-                        indexed.append(url)
-                    else:
-                        not_indexed.append({"url": url, "verdict": verdict})
-
-                except Exception as e:
-                    logger.warning(f"Could not inspect {url}: {e}")
+                verdict = verdicts.get(url)
+                if verdict is None:
+                    continue
+                if verdict == "PASS":
+                    indexed.append(url)
+                else:
+                    not_indexed.append({"url": url, "verdict": verdict})
 
             return {
                 "total_published": len(content_files),
@@ -103,37 +117,124 @@ class PerformanceMonitor:
             logger.warning("GSC API not configured, skipping indexation check")
             return {"status": "gsc_not_configured"}
 
+    def _cached_gsc(self, key: dict, fn, ttl: int = GSC_CACHE_TTL, cacheable=None):
+        """
+        Return fn()'s result, cached on disk under data/performance/.cache by a
+        hash of key (endpoint, site and request body) for up to ttl seconds.
+        A fresh result is only written if cacheable(result) is true (if given).
+        """
+        digest = hashlib.blake2b(orjson.dumps(key, option=orjson.OPT_SORT_KEYS))
+        cache_path = self.gsc_cache_dir / f"{digest.hexdigest()}.json"
+        try:
+            if time.time() - cache_path.stat().st_mtime < ttl:
+                return orjson.loads(cache_path.read_bytes())
+        except (FileNotFoundError, orjson.JSONDecodeError):
+            pass
+
+        result = fn()
+        if cacheable is not None and not cacheable(result):
+            return result
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_bytes(orjson.dumps(result))
+        return result
+
+    def _query_search_analytics(self, service, site_url: str, body: dict) -> dict:
+        """Run a Search Analytics query through the on-disk GSC cache."""
+        return self._cached_gsc(
+            {"endpoint": "searchanalytics", "siteUrl": site_url, "body": body},
+            lambda: service.searchanalytics()
+            .query(siteUrl=site_url, body=body)
+            .execute(),
+        )
+
+    def _inspect_urls(self, service, site_url: str, urls: list[str]) -> dict:
+        """
+        Run URL Inspection for many URLs using batched HTTP requests.
+        Rate-limited (429) inspections are retried with exponential backoff.
+        Returns {url: verdict} for every URL that could be inspected.
+        """
+        from googleapiclient.errors import HttpError
+
+        verdicts = {}
+        pending = list(urls)
+
+        for attempt in range(GSC_MAX_RETRIES + 1):
+            throttled = []
+
+            def on_response(request_id, response, exception):
+                url = pending[int(request_id)]
+                if exception is None:
+                    verdicts[url] = (
+                        response.get("inspectionResult", {})
+                        .get("indexStatusResult", {})
+                        .get("verdict", "UNKNOWN")
+                    )
+                elif isinstance(exception, HttpError) and exception.resp.status == 429:
+                    throttled.append(url)
+                else:
+                    logger.warning(f"Could not inspect {url}: {exception}")
+
+            for start in range(0, len(pending), GSC_BATCH_SIZE):
+                batch = service.new_batch_http_request(callback=on_response)
+                for i in range(start, min(start + GSC_BATCH_SIZE, len(pending))):
+                    batch.add(
+                        service.urlInspection()
+                        .index()
+                        .inspect(
+                            body={"inspectionUrl": pending[i], "siteUrl": site_url}
+                        ),
+                        request_id=str(i),
+                    )
+                try:
+                    batch.execute()
+                except Exception as e:
+                    logger.warning(f"URL inspection batch failed: {e}")
+
+            if not throttled:
+                break
+            if attempt < GSC_MAX_RETRIES:
+                delay = 2**attempt
+                logger.info(
+                    f"GSC throttled {len(throttled)} inspections, retrying in {delay}s"
+                )
+                time.sleep(delay)
+            else:
+                for url in throttled:
+                    logger.warning(f"Could not inspect {url}: rate limited")
+            pending = throttled
+
+        return verdicts
+
     def _get_search_metrics(self) -> dict:
         """Pull search performance data from GSC for the last 7 days."""
         try:
-            from google_auth import get_gsc_service
-
-            service = get_gsc_service()
-            site_url = os.environ.get("SITE_URL", "https://predictionscope.com")
+            service = self._service()
+            site_url = self.site_url
 
             end_date = datetime.now() - timedelta(days=2)  # GSC has 2-day lag
             start_date = end_date - timedelta(days=7)
 
-            response = (
-                service.searchanalytics()
-                .query(
-                    siteUrl=site_url,
-                    body={
-                        "startDate": start_date.strftime("%Y-%m-%d"),
-                        "endDate": end_date.strftime("%Y-%m-%d"),
-                        "dimensions": ["date"],
-                        "rowLimit": 30,
-                    },
-                )
-                .execute()
-            )
+            body = {
+                "startDate": start_date.strftime("%Y-%m-%d"),
+                "endDate": end_date.strftime("%Y-%m-%d"),
+                "dimensions": ["date"],
+                "rowLimit": 30,
+            }
+            response = self._query_search_analytics(service, site_url, body)
 
+            # One pass over the rows for totals and the daily series
             rows = response.get("rows", [])
-            total_impressions = sum(r.get("impressions", 0) for r in rows)
-            total_clicks = sum(r.get("clicks", 0) for r in rows)
-            avg_position = (
-                sum(r.get("position", 0) for r in rows) / len(rows) if rows else 0
-            )
+            total_impressions = total_clicks = total_position = 0
+            daily_data = []
+            for r in rows:
+                impressions, clicks = r["impressions"], r["clicks"]
+                total_impressions += impressions
+                total_clicks += clicks
+                total_position += r["position"]
+                daily_data.append(
+                    {"date": r["keys"][0], "impressions": impressions, "clicks": clicks}
+                )
+            avg_position = total_position / len(rows) if rows else 0
 
             return {
                 "period": f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}",
@@ -143,14 +244,7 @@ class PerformanceMonitor:
                 "ctr": round(total_clicks / total_impressions * 100, 2)
                 if total_impressions
                 else 0,
-                "daily_data": [
-                    {
-                        "date": r["keys"][0],
-                        "impressions": r["impressions"],
-                        "clicks": r["clicks"],
-                    }
-                    for r in rows
-                ],
+                "daily_data": daily_data,
             }
 
         except ImportError:
@@ -160,118 +254,108 @@ class PerformanceMonitor:
             logger.warning(f"GSC query failed: {e}")
             return {"status": "error", "error": str(e)}
 
+    def _get_page_metrics(self, days: int = 28, row_limit: int = 1000) -> list[dict]:
+        """
+        Per-page search metrics over the last `days`, sorted by impressions.
+        One query (cached) feeds both the top and underperforming page views.
+        """
+        service = self._service()
+        site_url = self.site_url
+
+        end_date = datetime.now() - timedelta(days=2)
+        start_date = end_date - timedelta(days=days)
+
+        body = {
+            "startDate": start_date.strftime("%Y-%m-%d"),
+            "endDate": end_date.strftime("%Y-%m-%d"),
+            "dimensions": ["page"],
+            "rowLimit": row_limit,
+            "orderBy": [{"fieldName": "impressions", "sortOrder": "DESCENDING"}],
+        }
+        response = self._query_search_analytics(service, site_url, body)
+
+        return [
+            {
+                "url": r["keys"][0],
+                "impressions": r["impressions"],
+                "clicks": r["clicks"],
+                "position": round(r["position"], 1),
+                "ctr": round(r["clicks"] / r["impressions"] * 100, 2)
+                if r["impressions"]
+                else 0,
+            }
+            for r in response.get("rows", [])
+        ]
+
     def _get_top_pages(self, limit: int = 10) -> list[dict]:
         """Get top performing pages by impressions."""
         try:
-            from google_auth import get_gsc_service
-
-            service = get_gsc_service()
-            site_url = os.environ.get("SITE_URL", "https://predictionscope.com")
-
-            end_date = datetime.now() - timedelta(days=2)
-            start_date = end_date - timedelta(days=28)
-
-            response = (
-                service.searchanalytics()
-                .query(
-                    siteUrl=site_url,
-                    body={
-                        "startDate": start_date.strftime("%Y-%m-%d"),
-                        "endDate": end_date.strftime("%Y-%m-%d"),
-                        "dimensions": ["page"],
-                        "rowLimit": limit,
-                        "orderBy": [
-                            {"fieldName": "impressions", "sortOrder": "DESCENDING"}
-                        ],
-                    },
-                )
-                .execute()
-            )
-
-            return [
-                {
-                    "url": r["keys"][0],
-                    "impressions": r["impressions"],
-                    "clicks": r["clicks"],
-                    "position": round(r["position"], 1),
-                    "ctr": round(r["clicks"] / r["impressions"] * 100, 2)
-                    if r["impressions"]
-                    else 0,
-                }
-                for r in response.get("rows", [])
-            ]
-
+            return self._get_page_metrics()[:limit]
         except Exception:
             return []
 
     def _get_underperforming_pages(self) -> list[dict]:
         """Identify pages with impressions but low CTR (opportunity to optimize)."""
         try:
-            from google_auth import get_gsc_service
-
-            service = get_gsc_service()
-            site_url = os.environ.get("SITE_URL", "https://predictionscope.com")
-
-            end_date = datetime.now() - timedelta(days=2)
-            start_date = end_date - timedelta(days=28)
-
-            response = (
-                service.searchanalytics()
-                .query(
-                    siteUrl=site_url,
-                    body={
-                        "startDate": start_date.strftime("%Y-%m-%d"),
-                        "endDate": end_date.strftime("%Y-%m-%d"),
-                        "dimensions": ["page"],
-                        "rowLimit": 100,
-                    },
-                )
-                .execute()
-            )
-
-            # Pages with 100+ impressions but <2% CTR
-            underperformers = [
-                {
-                    "url": r["keys"][0],
-                    "impressions": r["impressions"],
-                    "clicks": r["clicks"],
-                    "position": round(r["position"], 1),
-                    "ctr": round(r["clicks"] / r["impressions"] * 100, 2)
-                    if r["impressions"]
-                    else 0,
-                }
-                for r in response.get("rows", [])
-                if r["impressions"] >= 100
-                and (r["clicks"] / r["impressions"] < 0.02 if r["impressions"] else True)
-            ]
-
-            return sorted(underperformers, key=lambda x: x["impressions"], reverse=True)[
-                :10
-            ]
-
+            pages = self._get_page_metrics()
         except Exception:
             return []
 
+        # Pages with 100+ impressions but <2% CTR (already impression-sorted)
+        return [
+            page
+            for page in pages
+            if page["impressions"] >= 100
+            and page["clicks"] / page["impressions"] < 0.02
+        ][:10]
+
     def _get_inventory_stats(self) -> dict:
         """Count content across buckets."""
         stats = {"learn": 0, "markets": 0, "best": 0, "total": 0}
+
+        inventory = self._cached_inventory()
+        if inventory is not None:
+            stats.update(Counter(item["bucket"] for item in inventory))
+            stats["total"] = len(inventory)
+            return stats
+
         for bucket in ["learn", "markets", "best"]:
-            content_dir = f"content/{bucket}"
-            if os.path.exists(content_dir):
-                files = [f for f in os.listdir(content_dir) if f.endswith(".md")]
-                stats[bucket] = len(files)
-                stats["total"] += len(files)
+            count = len(self._list_markdown(f"content/{bucket}"))
+            stats[bucket] = count
+            stats["total"] += count
         return stats
 
     def _get_published_urls(self) -> list[str]:
         """Get all published page URLs."""
-        base_url = os.environ.get("SITE_URL", "https://predictionscope.com")
-        urls = []
-        for bucket in ["learn", "markets", "best"]:
-            content_dir = f"content/{bucket}"
-            if os.path.exists(content_dir):
-                for f in os.listdir(content_dir):
-                    if f.endswith(".md"):
-                        slug = f.replace(".md", "")
-                        urls.append(f"{base_url}/{bucket}/{slug}")
-        return urls
+        base_url = self.site_url
+
+        inventory = self._cached_inventory()
+        if inventory is not None:
+            return [f"{base_url}{item['url']}" for item in inventory]
+
+        return [
+            f"{base_url}/{bucket}/{name[: -len('.md')]}"
+            for bucket in ["learn", "markets", "best"]
+            for name in self._list_markdown(f"content/{bucket}")
+        ]
+
+    def _cached_inventory(self) -> list[dict] | None:
+        """
+        Content inventory from the shared linker, else the prebuilt
+        frontmatter index. None when neither is available (or it's stale).
+        """
+        if self.linker is not None:
+            return self.linker.get_content_inventory()
+        return load_frontmatter_index()
+
+    def _list_markdown(self, content_dir: str) -> list[str]:
+        """Markdown filenames in a directory, via a single scandir pass."""
+        try:
+            with os.scandir(content_dir) as it:
+                return [
+                    e.name
+                    for e in it
+                    if e.name.endswith(".md") and e.is_file(follow_symlinks=False)
+                ]
+        except FileNotFoundError:
+            return []
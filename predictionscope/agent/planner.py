@@ -15,13 +15,17 @@ logger = logging.getLogger("predictionscope")
 class ContentPlanner:
     """Plans daily content based on bucket weights, gaps, and opportunities."""
 
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, linker=None):
         self.config = config
+        self.linker = linker  # shared LinkGraphManager, so its inventory cache is reused
         self.buckets = config.get("content_buckets", {})
         self.phases = config.get("phases", {})
 
     def create_daily_plan(
-        self, opportunities: list[dict], max_articles: int = 5
+        self,
+        opportunities: list[dict],
+        max_articles: int = 5,
+        total_published: int | None = None,
     ) -> list[dict]:
         """
         Select which opportunities to execute today.
@@ -32,7 +36,7 @@ class ContentPlanner:
         3. Select highest-priority items that balance the mix
         4. Respect max_articles limit
         """
-        current_phase = self._determine_phase()
+        current_phase = self._determine_phase(total_published)
         target_mix = current_phase.get(
             "content_mix",
             {"learn": 0.50, "markets": 0.35, "best": 0.15},
@@ -84,18 +88,24 @@ class ContentPlanner:
 
         return plan
 
-    def _determine_phase(self) -> dict:
-        """Determine which phase the agent is in based on content inventory."""
-        # For now, default to phase 1
-        # TODO: Check actual content counts and metrics against phase criteria
-        from linker import LinkGraphManager
-
+    def _determine_phase(self, total_published: int | None = None) -> dict:
+        """
+        Determine which phase the agent is in based on content inventory.
+        Callers that already know the published count can pass it in to skip
+        the inventory lookup.
+        """
+        # TODO: Check metrics against phase criteria, not just content counts
         try:
-            linker = LinkGraphManager(self.config)
-            inventory = linker.get_content_inventory()
-            total_published = len(
-                [c for c in inventory if c.get("status") == "published"]
-            )
+            if total_published is None:
+                if self.linker is None:
+                    from linker import LinkGraphManager
+
+                    self.linker = LinkGraphManager(self.config)
+                total_published = sum(
+                    1
+                    for c in self.linker.get_content_inventory()
+                    if c.get("status") == "published"
+                )
 
             phase_1 = self.phases.get("phase_1", {})
             phase_2 = self.phases.get("phase_2", {})
@@ -0,0 +1,87 @@
+"""
+PredictionScope Claude Rate Limiter
+Keeps concurrent Claude calls within the account's requests-per-minute
+and input-tokens-per-minute limits instead of bursting into 429s.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("predictionscope")
+
+WINDOW_SECONDS = 60.0
+
+
+def estimate_tokens(params: dict) -> int:
+    """Rough input-token estimate (~4 chars/token) for a Messages API request."""
+    system = params.get("system", "")
+    if isinstance(system, list):
+        system = "".join(block.get("text", "") for block in system)
+
+    chars = len(system)
+    for message in params.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(block.get("text", "") for block in content)
+        chars += len(content)
+    return chars // 4
+
+
+class RateLimiter:
+    """Sliding-window limiter over requests and input tokens per minute."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._events: deque[tuple[float, int]] = deque()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RateLimiter":
+        agent = config.get("agent", {})
+        return cls(rpm=agent.get("claude_rpm", 50), tpm=agent.get("claude_tpm", 30000))
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int):
+        """Wait until a request of `tokens` input tokens fits in the window."""
+        # No lock: the check and record() run without yielding to the loop, so
+        # a waiter that wakes up re-checks against whatever others recorded.
+        # (An asyncio.Lock would bind to the first loop and break later runs.)
+        while True:
+            wait = self._time_until_capacity(tokens)
+            if wait <= 0:
+                break
+            logger.info(f"Claude rate limit reached, waiting {wait:.1f}s")
+            await asyncio.sleep(wait)
+        self.record(tokens)
+        yield
+
+    def wait(self, tokens: int):
+        """Blocking counterpart of acquire() for synchronous calls."""
+        while True:
+            wait = self._time_until_capacity(tokens)
+            if wait <= 0:
+                break
+            logger.info(f"Claude rate limit reached, waiting {wait:.1f}s")
+            time.sleep(wait)
+        self.record(tokens)
+
+    def record(self, tokens: int):
+        """Count a request made outside acquire() (e.g. a synchronous call)."""
+        self._events.append((time.monotonic(), tokens))
+
+    def _time_until_capacity(self, tokens: int) -> float:
+        now = time.monotonic()
+        while self._events and now - self._events[0][0] >= WINDOW_SECONDS:
+            self._events.popleft()
+
+        if not self._events:
+            return 0
+        used = sum(t for _, t in self._events)
+        if len(self._events) < self.rpm and used + tokens <= self.tpm:
+            return 0
+
+        # Capacity frees up as the oldest request ages out of the window
+        return self._events[0][0] + WINDOW_SECONDS - now
@@ -5,11 +5,106 @@ brand guidelines, and SEO best practices.
 """
 
 import os
-import json
+import re
+import asyncio
 import yaml
+import hashlib
+import orjson
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
+from rate_limiter import RateLimiter, estimate_tokens
+
+try:
+    # libyaml-backed loader/emitter; an order of magnitude faster than pure Python
+    from yaml import CSafeDumper as _YamlDumper
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeDumper as _YamlDumper
+    from yaml import SafeLoader as _YamlLoader
+
+ARTICLE_CACHE_DIR = Path("cache/articles")
+
+# Title/keyword words too common in this domain to signal a relevant market
+RELEVANCE_STOPWORDS = frozenset(
+    "about after before from into that this what when will with "
+    "prediction predictions market markets odds".split()
+)
+
+# The long-lived sync client keeps its connection pool (and TLS sessions) warm
+# across requests. An async client's pool is tied to the event loop that opened
+# it, so async callers open one per batch and close it with that loop.
+_client = None
+
+
+def get_claude_client(max_retries: int = 2):
+    """Return the process-wide Anthropic client, creating it on first use."""
+    global _client
+    if _client is None:
+        from anthropic import Anthropic
+
+        _client = Anthropic(max_retries=max_retries)
+    return _client
+
+
+# path -> (mtime, parsed contents); lets writers re-check files with one stat
+_file_cache: dict[str, tuple[float, object]] = {}
+
+
+def _read_cached(path: str, parse):
+    """
+    Return parse(file text), re-reading only when the file's mtime changes.
+    Raises FileNotFoundError if the file doesn't exist.
+    """
+    mtime = os.stat(path).st_mtime
+    cached = _file_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r") as f:
+        value = parse(f.read())
+    _file_cache[path] = (mtime, value)
+    return value
+
+
+def _parse_affiliates(text: str) -> tuple[dict, str]:
+    """Affiliates config plus its platforms block pre-rendered as JSON."""
+    data = yaml.load(text, Loader=_YamlLoader) or {}
+    platforms_json = orjson.dumps(
+        data.get("platforms", {}),
+        option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+        default=str,
+    ).decode()
+    return data, platforms_json
+
+
+def _load_affiliates() -> tuple[dict, str]:
+    """
+    Parsed config/affiliates.yaml and its platforms JSON, both redone only
+    after the file changes.
+    """
+    try:
+        return _read_cached("config/affiliates.yaml", _parse_affiliates)
+    except FileNotFoundError:
+        return {}, "{}"
+
+
+def _load_templates() -> dict:
+    """Article templates by name, re-read only after they change."""
+    templates = {}
+    for bucket in ["learn", "market", "affiliate"]:
+        try:
+            templates[bucket] = _read_cached(f"templates/{bucket}.md", str)
+        except FileNotFoundError:
+            continue
+    return templates
+
+
+@lru_cache(maxsize=128)
+def _keyword_pattern(keywords: frozenset) -> re.Pattern:
+    """One alternation regex for a keyword set; a C-level scan per title."""
+    return re.compile("|".join(map(re.escape, sorted(keywords))))
+
 
 class ContentWriter:
     """Generates articles using Claude API with structured prompts per content type."""
@@ -17,79 +112,275 @@ class ContentWriter:
     def __init__(self, config: dict):
         self.config = config
         self.brand = config.get("brand", {})
-        self.affiliates = self._load_affiliates()
-        self.templates = self._load_templates()
-
-    def _load_affiliates(self) -> dict:
-        try:
-            with open("config/affiliates.yaml", "r") as f:
-                return yaml.safe_load(f)
-        except FileNotFoundError:
-            return {}
-
-    def _load_templates(self) -> dict:
-        templates = {}
-        for bucket in ["learn", "market", "affiliate"]:
-            path = f"templates/{bucket}.md"
-            if os.path.exists(path):
-                with open(path, "r") as f:
-                    templates[bucket] = f.read()
-        return templates
+        # Fixed for the writer's lifetime; part of the cached prompt prefix
+        self._voice = self.brand.get("voice", "")
+        self._word_ranges = {
+            bucket: f"{settings['min_word_count']}-{settings['max_word_count']}"
+            for bucket, settings in config.get("content_buckets", {}).items()
+        }
+        self.affiliates, self._platforms_json = _load_affiliates()
+        self._disclosures = self.affiliates.get("disclosures", {})
+        self.templates = _load_templates()
+        self.rate_limiter = RateLimiter.from_config(config)
+        # Per-bucket instructions only depend on config, brand and affiliates,
+        # so they're rendered once; each is the cached system block verbatim.
+        self._static_prompts = {
+            "learn": self._build_learn_prompt(),
+            "markets": self._build_markets_prompt(),
+            "best": self._build_affiliate_prompt(),
+        }
+        self._slugs_source = None
+        self._slugs_len = 0
+        self._slugs_json = "[]"
 
     def generate_article(
-        self, plan_item: dict, market_data: dict, existing_content: list
+        self,
+        plan_item: dict,
+        market_data: dict,
+        existing_content: list,
+        use_cache: bool = True,
     ) -> dict:
         """
         Generate a complete article based on the content plan item.
+        A previously generated article for the same plan (and, for /markets/,
+        the same prices) is returned from cache/articles without calling Claude.
+        Uses the shared sync client; see agenerate_article for concurrent use.
 
         Returns dict with:
             - title, slug, bucket, content (markdown), meta_description,
               target_keywords, internal_links, schema_data
         """
-        from anthropic import Anthropic
+        relevant_data = self._relevant_data(plan_item, market_data)
+        cache_path = self._article_cache_path(plan_item, relevant_data)
+        if use_cache and cache_path.exists():
+            return orjson.loads(cache_path.read_bytes())
 
-        client = Anthropic()
-        bucket = plan_item["bucket"]
+        client = get_claude_client(
+            max_retries=self.config["agent"].get("claude_max_retries", 5)
+        )
+        request = self._build_request(plan_item, relevant_data, existing_content)
+
+        self.rate_limiter.wait(estimate_tokens(request))
+        with client.messages.stream(**request) as stream:
+            text = "".join(stream.text_stream)
+        return self._finish_article(plan_item, relevant_data, cache_path, text)
+
+    async def agenerate_article(
+        self,
+        plan_item: dict,
+        market_data: dict,
+        existing_content: list,
+        use_cache: bool = True,
+        client=None,
+    ) -> dict:
+        """
+        Async implementation of generate_article, used for concurrent fan-out.
+        client is an open AsyncAnthropic; without one, a client is opened and
+        closed around this call.
+        """
+        relevant_data = self._relevant_data(plan_item, market_data)
+        cache_path = self._article_cache_path(plan_item, relevant_data)
+        if use_cache and cache_path.exists():
+            return orjson.loads(cache_path.read_bytes())
+
+        request = self._build_request(plan_item, relevant_data, existing_content)
+        if client is None:
+            async with self._open_async_client() as client:
+                text = await self._astream(client, request)
+        else:
+            text = await self._astream(client, request)
+        return self._finish_article(plan_item, relevant_data, cache_path, text)
 
-        # Build the prompt based on content type
-        if bucket == "learn":
-            system_prompt = self._build_learn_prompt(plan_item, existing_content)
-        elif bucket == "markets":
-            system_prompt = self._build_markets_prompt(
-                plan_item, market_data, existing_content
+    async def _astream(self, client, request: dict) -> str:
+        """
+        Stream the response: text arrives while the article is still being
+        generated (other articles' coroutines run in the gaps), and the
+        connection never sits idle long enough to hit a read timeout.
+        """
+        async with self.rate_limiter.acquire(estimate_tokens(request)):
+            async with client.messages.stream(**request) as stream:
+                chunks = [text async for text in stream.text_stream]
+        return "".join(chunks)
+
+    async def agenerate_batch(
+        self,
+        plan_items: list[dict],
+        market_data: dict,
+        existing_content: list,
+        concurrency: int | None = None,
+        use_cache: bool = True,
+    ) -> list:
+        """
+        Generate several articles concurrently, at most `concurrency` in flight
+        (defaults to agent.max_concurrent_claude). Results line up with
+        plan_items; a failed article is returned as its exception.
+        """
+        if concurrency is None:
+            concurrency = self.config["agent"].get("max_concurrent_claude", 3)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        # Every article in the batch shares one client, closed with the batch
+        async with self._open_async_client() as client:
+
+            async def generate(item: dict) -> dict:
+                async with semaphore:
+                    return await self.agenerate_article(
+                        item, market_data, existing_content, use_cache, client
+                    )
+
+            return await asyncio.gather(
+                *(generate(item) for item in plan_items), return_exceptions=True
             )
-        elif bucket == "best":
-            system_prompt = self._build_affiliate_prompt(plan_item, existing_content)
-        else:
+
+    def _open_async_client(self):
+        """A new AsyncAnthropic; use it with async with so its pool is closed."""
+        from anthropic import AsyncAnthropic
+
+        return AsyncAnthropic(
+            max_retries=self.config["agent"].get("claude_max_retries", 5)
+        )
+
+    def _relevant_data(self, plan_item: dict, market_data: dict) -> dict:
+        """
+        Only /markets/ articles quote market data; it's extracted once and
+        shared between the cache key, the prompt and the article snapshot.
+        """
+        if plan_item["bucket"] != "markets":
+            return {}
+        return self._extract_relevant_data(plan_item, market_data)
+
+    def _finish_article(
+        self, plan_item: dict, relevant_data: dict, cache_path: Path, text: str
+    ) -> dict:
+        """Build the article from Claude's reply and cache it if it parsed."""
+        article_data = self._parse_response(text)
+        article = self._build_article(plan_item, relevant_data, text, article_data)
+        # A reply that didn't parse is still used this run, but never replayed
+        if article_data is not None:
+            self._save_cached_article(cache_path, article)
+        return article
+
+    def _article_cache_path(self, plan_item: dict, relevant_data: dict) -> Path:
+        """
+        Cache file for a plan item, keyed by model, bucket instructions, slug
+        and keywords. Market articles also key on the prices they'd quote, so a
+        rerun only hits the cache while the underlying markets haven't moved.
+        """
+        static_prompt = self._static_prompts.get(plan_item["bucket"], "")
+        key = {
+            "model": self.config["agent"]["model"],
+            "prompt": hashlib.blake2b(static_prompt.encode()).hexdigest(),
+            "bucket": plan_item["bucket"],
+            "slug": plan_item["slug"],
+            "keywords": sorted(plan_item.get("target_keywords", [])),
+        }
+        if plan_item["bucket"] == "markets":
+            key["prices"] = [
+                [m["source"], m.get("title", ""), m.get("yes_price", m.get("price"))]
+                for m in relevant_data["markets"]
+            ]
+        digest = hashlib.blake2b(orjson.dumps(key, option=orjson.OPT_SORT_KEYS))
+        return ARTICLE_CACHE_DIR / f"{digest.hexdigest()}.json"
+
+    def _save_cached_article(self, cache_path: Path, article: dict):
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_bytes(orjson.dumps(article, default=str))
+
+    def _build_request(
+        self, plan_item: dict, relevant_data: dict, existing_content: list
+    ) -> dict:
+        """
+        Build the Messages API parameters for a plan item. relevant_data is the
+        _extract_relevant_data result (only used for /markets/).
+        """
+        bucket = plan_item["bucket"]
+
+        # Static instructions were built once per bucket in __init__
+        static_prompt = self._static_prompts.get(bucket)
+        if static_prompt is None:
             raise ValueError(f"Unknown bucket: {bucket}")
+        dynamic_prompt = (
+            self._build_markets_data_prompt(relevant_data)
+            if bucket == "markets"
+            else ""
+        )
 
-        # Generate the article
-        response = client.messages.create(
-            model=self.config["agent"]["model"],
-            max_tokens=8192,
-            system=system_prompt,
-            messages=[
+        # The per-bucket instructions are identical across articles, so they sit
+        # in a cached block; anything plan-specific follows the cache breakpoint.
+        system = [
+            {
+                "type": "text",
+                "text": static_prompt,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+        if dynamic_prompt:
+            system.append({"type": "text", "text": dynamic_prompt})
+
+        # The site inventory changes as articles land, so it rides in the user
+        # turn rather than invalidating the cached system prefix.
+        existing_slugs = self._existing_slugs_json(existing_content)
+
+        request = {
+            "model": self.config["agent"]["model"],
+            "max_tokens": 8192,
+            "system": system,
+            "messages": [
                 {
                     "role": "user",
                     "content": f"Write the article: {plan_item['title']}\n\n"
                     f"Target keywords: {', '.join(plan_item.get('target_keywords', []))}\n"
                     f"Description: {plan_item.get('description', '')}\n\n"
+                    f"EXISTING CONTENT ON SITE (link to these where relevant):\n"
+                    f"{existing_slugs}\n\n"
                     f"Respond with ONLY the JSON object as specified in your instructions.",
                 }
             ],
-        )
+        }
+
+        # Left to the API default ("auto") unless the config pins a tier
+        service_tier = self.config["agent"].get("service_tier")
+        if service_tier:
+            request["service_tier"] = service_tier
+        return request
 
-        # Parse the response
+    def _existing_slugs_json(self, existing_content: list) -> str:
+        """
+        JSON list of up to 30 existing slugs for the prompt. A batch passes the
+        same inventory list for every article, so it's encoded once per list.
+        """
+        if (
+            self._slugs_source is not existing_content
+            or self._slugs_len != len(existing_content)
+        ):
+            self._slugs_json = orjson.dumps(
+                [c["slug"] for c in existing_content[:30]], option=orjson.OPT_INDENT_2
+            ).decode()
+            self._slugs_source = existing_content
+            self._slugs_len = len(existing_content)
+        return self._slugs_json
+
+    def _parse_response(self, text: str) -> dict | None:
+        """Claude's JSON reply as a dict, or None if it doesn't parse."""
         try:
-            raw = response.content[0].text
+            raw = text
             # Handle potential markdown wrapping
             if raw.startswith("```"):
                 raw = raw.split("\n", 1)[1].rsplit("```", 1)[0]
-            article_data = json.loads(raw)
-        except (json.JSONDecodeError, IndexError) as e:
+            return orjson.loads(raw)
+        except (orjson.JSONDecodeError, IndexError):
+            return None
+
+    def _build_article(
+        self, plan_item: dict, relevant_data: dict, text: str, article_data: dict | None
+    ) -> dict:
+        """Merge the parsed response (None if it didn't parse) with the plan metadata."""
+        bucket = plan_item["bucket"]
+
+        if article_data is None:
             # Fallback: treat the whole response as content
             article_data = {
-                "content": response.content[0].text,
+                "content": text,
                 "meta_description": plan_item.get("description", ""),
                 "internal_links": [],
             }
@@ -110,9 +401,7 @@ class ContentWriter:
             ][0],
             "generated_at": datetime.now().isoformat(),
             "word_count": len(article_data.get("content", "").split()),
-            "market_data_snapshot": self._extract_relevant_data(
-                plan_item, market_data
-            ),
+            "market_data_snapshot": relevant_data,
         }
 
         # Build the final markdown file with frontmatter
@@ -124,23 +413,20 @@ class ContentWriter:
     # Prompt Builders
     # -------------------------------------------------------------------------
 
-    def _build_learn_prompt(self, plan_item: dict, existing_content: list) -> str:
-        """System prompt for educational/explainer articles."""
-        word_range = (
-            f"{self.config['content_buckets']['learn']['min_word_count']}-"
-            f"{self.config['content_buckets']['learn']['max_word_count']}"
-        )
+    def _build_learn_prompt(self) -> str:
+        """Static system prompt for educational/explainer articles."""
+        word_range = self._word_ranges["learn"]
         return f"""You are the lead writer for PredictionScope, a media site that explains 
 prediction markets to a mainstream audience.
 
 BRAND VOICE:
-{self.brand.get('voice', '')}
+{self._voice}
 
 CONTENT GUIDELINES:
-{json.dumps(self.brand.get('guidelines', []), indent=2)}
+{orjson.dumps(self.brand.get('guidelines', []), option=orjson.OPT_INDENT_2).decode()}
 
 FORBIDDEN CONTENT:
-{json.dumps(self.brand.get('forbidden', []), indent=2)}
+{orjson.dumps(self.brand.get('forbidden', []), option=orjson.OPT_INDENT_2).decode()}
 
 YOUR TASK: Write an educational article for the /learn/ section of PredictionScope.
 
@@ -153,9 +439,6 @@ REQUIREMENTS:
 - Include a natural FAQ section at the end (3-5 questions)
 - Suggest 2-5 internal links to other PredictionScope pages
 
-EXISTING CONTENT ON SITE (link to these where relevant):
-{json.dumps([c['slug'] for c in existing_content[:30]], indent=2)}
-
 SEO GUIDELINES:
 - Include the primary keyword in the first paragraph
 - Use the primary keyword in at least one H2
@@ -174,26 +457,17 @@ RESPOND WITH A JSON OBJECT:
     ]
 }}"""
 
-    def _build_markets_prompt(
-        self, plan_item: dict, market_data: dict, existing_content: list
-    ) -> str:
-        """System prompt for topical/market-driven articles."""
-        relevant_data = self._extract_relevant_data(plan_item, market_data)
-        word_range = (
-            f"{self.config['content_buckets']['markets']['min_word_count']}-"
-            f"{self.config['content_buckets']['markets']['max_word_count']}"
-        )
+    def _build_markets_prompt(self) -> str:
+        """Static system prompt for topical/market-driven articles."""
+        word_range = self._word_ranges["markets"]
         return f"""You are the lead writer for PredictionScope, a media site that covers 
 current events through the lens of prediction markets.
 
 BRAND VOICE:
-{self.brand.get('voice', '')}
+{self._voice}
 
 YOUR TASK: Write a topical article for the /markets/ section of PredictionScope.
 
-REAL MARKET DATA (use these exact numbers):
-{json.dumps(relevant_data, indent=2)}
-
 REQUIREMENTS:
 - Word count: {word_range} words
 - Lead with what's happening in the real world, then bring in the prediction market angle
@@ -204,9 +478,6 @@ REQUIREMENTS:
 - Link to educational content to explain PM concepts to new readers
 - Include a "What the Markets Say" summary box at the top
 
-EXISTING CONTENT ON SITE (link to these where relevant):
-{json.dumps([c['slug'] for c in existing_content[:30]], indent=2)}
-
 IMPORTANT:
 - Do NOT frame this as investment advice
 - Include real data only — never fabricate odds or prices
@@ -229,24 +500,24 @@ RESPOND WITH A JSON OBJECT:
     }}
 }}"""
 
-    def _build_affiliate_prompt(self, plan_item: dict, existing_content: list) -> str:
-        """System prompt for affiliate/comparison articles."""
-        # Get relevant platform data
-        platforms = self.affiliates.get("platforms", {})
-        disclosures = self.affiliates.get("disclosures", {})
-        word_range = (
-            f"{self.config['content_buckets']['best']['min_word_count']}-"
-            f"{self.config['content_buckets']['best']['max_word_count']}"
-        )
+    def _build_markets_data_prompt(self, relevant_data: dict) -> str:
+        """Per-article system block carrying the market data to quote."""
+        return f"""REAL MARKET DATA (use these exact numbers):
+{orjson.dumps(relevant_data, option=orjson.OPT_INDENT_2).decode()}"""
+
+    def _build_affiliate_prompt(self) -> str:
+        """Static system prompt for affiliate/comparison articles."""
+        disclosures = self._disclosures
+        word_range = self._word_ranges["best"]
 
         return f"""You are the lead writer for PredictionScope. You're writing an honest, 
 useful comparison/review article for the /best/ section.
 
 BRAND VOICE:
-{self.brand.get('voice', '')}
+{self._voice}
 
 PLATFORM DATA (use this for accuracy):
-{json.dumps(platforms, indent=2, default=str)}
+{self._platforms_json}
 
 REQUIRED DISCLOSURES (include at the top of the article):
 Affiliate: {disclosures.get('affiliate_disclosure', '')}
@@ -270,9 +541,6 @@ IMPORTANT:
 - Don't oversell — being honest builds more trust and converts better
 - Include genuine drawbacks and who each platform is NOT for
 
-EXISTING CONTENT ON SITE:
-{json.dumps([c['slug'] for c in existing_content[:30]], indent=2)}
-
 RESPOND WITH A JSON OBJECT:
 {{
     "content": "The full article in markdown format with comparison tables",
@@ -291,10 +559,17 @@ RESPOND WITH A JSON OBJECT:
         """Pull out market data relevant to a specific article topic."""
         relevant = {"extracted_for": plan_item["title"], "markets": []}
 
-        keywords = set()
-        for kw in plan_item.get("target_keywords", []):
-            keywords.update(kw.lower().split())
-        keywords.update(plan_item.get("title", "").lower().split())
+        # Short tokens ("the", "fed") and words every market title shares match
+        # too broadly as substrings, so they never become relevance keywords.
+        tokens = " ".join(
+            [*plan_item.get("target_keywords", []), plan_item.get("title", "")]
+        ).lower().split()
+        keywords = frozenset(
+            t for t in tokens if len(t) > 3 and t not in RELEVANCE_STOPWORDS
+        )
+        if not keywords:
+            return relevant
+        pattern = _keyword_pattern(keywords)
 
         for source in ["kalshi", "polymarket"]:
             if source not in market_data:
@@ -305,7 +580,7 @@ RESPOND WITH A JSON OBJECT:
                     continue
                 for market in markets:
                     title = market.get("title", "").lower()
-                    if any(kw in title for kw in keywords if len(kw) > 3):
+                    if pattern.search(title):
                         relevant["markets"].append(
                             {"source": source, **market}
                         )
@@ -334,7 +609,7 @@ RESPOND WITH A JSON OBJECT:
                 content = parts[2].strip()
 
         return f"""---
-{yaml.dump(frontmatter, default_flow_style=False).strip()}
+{yaml.dump(frontmatter, Dumper=_YamlDumper, default_flow_style=False).strip()}
 ---
 
 {content}
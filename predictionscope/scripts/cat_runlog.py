@@ -0,0 +1,25 @@
+"""
+Print an agent run log as indented JSON.
+Usage: python scripts/cat_runlog.py logs/runs/<run_id>.mp
+"""
+
+import sys
+
+import msgpack
+import orjson
+
+
+def main(path: str):
+    with open(path, "rb") as f:
+        if path.endswith(".mp"):
+            log = msgpack.unpackb(f.read())
+        else:
+            log = orjson.loads(f.read())
+    print(orjson.dumps(log, option=orjson.OPT_INDENT_2).decode())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python scripts/cat_runlog.py <run-log-file>")
+        sys.exit(1)
+    main(sys.argv[1])
@@ -59,8 +59,11 @@ node_modules/
 .next/
 out/
 logs/
+cache/
 data/market-snapshots/
 data/performance/
+data/etag-cache.json
+data/snapshots.sqlite*
 __pycache__/
 *.pyc
 .vercel/